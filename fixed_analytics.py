@@ -1,40 +1,108 @@
-import json
+import atexit
+import collections
+import os
+import threading
+import time
 from datetime import datetime
 
-LOG_FILE = "analytics.json"
+try:
+    import orjson
 
-def track_interaction(model, prompt, response):
-    """Log user interactions with timestamp."""
+    def _dumps_line(obj):
+        return orjson.dumps(obj) + b"\n"
+
+    _loads = orjson.loads
+except ImportError:  # fall back to stdlib json when orjson isn't installed
+    import json
+
+    def _dumps_line(obj):
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8") + b"\n"
+
+    _loads = json.loads
+
+LOG_FILE = "analytics.jsonl"
+
+# In-memory buffer so each interaction is a cheap list append; disk writes
+# are amortized over _BUFFER_MAX entries (plus a final flush at exit).
+# Streamlit runs each session in its own thread, so appends and flushes
+# are guarded by a lock.
+_BUFFER = []
+_BUFFER_MAX = 100
+_BUFFER_LOCK = threading.Lock()
+
+# Rotate the log once it passes this size so readers stay bounded
+_MAX_LOG_BYTES = 50 << 20
+
+def _rotate_if_needed():
+    """Roll the log to a timestamped sibling once it exceeds the size cap."""
+    try:
+        if os.path.getsize(LOG_FILE) > _MAX_LOG_BYTES:
+            os.replace(LOG_FILE, f"{LOG_FILE}.{int(time.time())}")
+    except OSError:
+        pass
+
+def flush():
+    """Write all buffered log entries to disk in a single append."""
+    with _BUFFER_LOCK:
+        if not _BUFFER:
+            return
+        try:
+            with open(LOG_FILE, "ab") as f:
+                f.write(b"".join(_BUFFER))
+            _BUFFER.clear()
+            _rotate_if_needed()
+        except Exception as e:
+            print(f"Error saving to analytics log: {e}")
+
+atexit.register(flush)
+
+def track_interaction(model, prompt, response, ts=None):
+    """Log user interactions with timestamp (ts lets callers reuse one)."""
     log_entry = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": ts or datetime.now().isoformat(),
         "model": model,
         "prompt": prompt,
         "response": response,
     }
-    try:
-        with open(LOG_FILE, "r", encoding='utf-8') as f:
-            logs = json.load(f)
-    except FileNotFoundError:
-        logs = []
-    except json.JSONDecodeError:
-        logs = []
-
-    logs.append(log_entry)
-
-    try:
-        with open(LOG_FILE, "w", encoding='utf-8') as f:
-            json.dump(logs, f, indent=2)
-    except Exception as e:
-        print(f"Error saving to analytics log: {e}")
+    with _BUFFER_LOCK:
+        _BUFFER.append(_dumps_line(log_entry))
+        should_flush = len(_BUFFER) >= _BUFFER_MAX
+    if should_flush:
+        flush()
 
 def get_analytics():
     """Retrieve analytics data."""
+    flush()  # make buffered entries visible to readers
+    logs = []
     try:
-        with open(LOG_FILE, "r", encoding='utf-8') as f:
-            logs = json.load(f)
+        with open(LOG_FILE, "rb") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    logs.append(_loads(line))
+                except ValueError:
+                    print("Error reading analytics file - skipping corrupted line")
         return logs
     except FileNotFoundError:
         return []
-    except json.JSONDecodeError:
-        print("Error reading analytics file - corrupted JSON")
-        return []
\ No newline at end of file
+
+def get_recent(n=10):
+    """Return the last n log entries without parsing the whole file."""
+    flush()
+    try:
+        with open(LOG_FILE, "rb") as f:
+            tail = collections.deque(f, maxlen=n)
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in tail:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entries.append(_loads(line))
+        except ValueError:
+            print("Error reading analytics file - skipping corrupted line")
+    return entries
@@ -1,11 +1,13 @@
 import streamlit as st
 import os
 import csv
+import glob
+import threading
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
-from llm_handler import get_llm_response, get_model_info, clear_model_cache
-from analytics import track_interaction, get_analytics
+from llm_handler import stream_llm_response, get_model_info, clear_model_cache, load_model
+from analytics import track_interaction, get_recent, flush as flush_analytics, LOG_FILE
 
 # Page configuration
 st.set_page_config(
@@ -46,25 +48,33 @@ st.markdown("""
 def save_interaction(user_query, llm_name, response):
     """Save interaction data to both CSV and JSON formats."""
     try:
-        # Save to CSV
+        # Save to CSV. Whether the header row exists is checked on disk once
+        # per session and then tracked in st.session_state, which (unlike a
+        # module global in this script) survives Streamlit reruns.
         file_path = "interactions.csv"
-        file_exists = os.path.isfile(file_path)
-        
+        if st.session_state.get('csv_header_written') is None:
+            st.session_state['csv_header_written'] = os.path.exists(file_path)
+
+        # One timestamp per interaction, shared by the CSV row and analytics log
+        ts = datetime.now().isoformat()
+
         interaction_data = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": ts,
             "user_query": user_query,
             "llm_name": llm_name,
             "response": response,
         }
         
-        with open(file_path, mode="a", newline="", encoding="utf-8") as file:
+        # Large buffer so each row costs one memcpy, not several small syscalls
+        with open(file_path, mode="a", newline="", encoding="utf-8", buffering=1 << 20) as file:
             writer = csv.DictWriter(file, fieldnames=["timestamp", "user_query", "llm_name", "response"])
-            if not file_exists:
+            if not st.session_state['csv_header_written']:
                 writer.writeheader()
+                st.session_state['csv_header_written'] = True
             writer.writerow(interaction_data)
         
         # Also save to analytics JSON
-        track_interaction(llm_name, user_query, response)
+        track_interaction(llm_name, user_query, response, ts=ts)
         
     except Exception as e:
         st.error(f"Error saving interaction: {str(e)}")
@@ -73,10 +83,12 @@ def article_generator():
     """Main article generation interface."""
     st.markdown("<h1 class='main-header'>🤖 Article Generator with Multiple LLMs</h1>", unsafe_allow_html=True)
     
+    # Fetch model info once per rerun; reused by the sidebar and the selectbox
+    model_info = get_model_info()
+
     # Model information sidebar
     with st.sidebar:
         st.header("Model Information")
-        model_info = get_model_info()
         for name, info in model_info.items():
             status = "✅ Loaded" if info["loaded"] else "⏳ Not loaded"
             st.markdown(f"""
@@ -105,7 +117,7 @@ def article_generator():
     with col2:
         selected_llm = st.selectbox(
             "Select an LLM:",
-            list(get_model_info().keys()),
+            list(model_info.keys()),
             help="Choose which language model to use for generation"
         )
         
@@ -127,30 +139,30 @@ def article_generator():
     # Generation logic
     if generate_button:
         if user_query.strip():
-            with st.spinner(f"Generating article using {selected_llm}..."):
-                try:
-                    response = get_llm_response(selected_llm, user_query, max_length)
-                    
-                    st.success("Article generated successfully!")
-                    
-                    # Display the response
-                    st.markdown("### Generated Article")
-                    st.markdown("---")
-                    st.write(response)
-                    
-                    # Save the interaction
-                    save_interaction(user_query, selected_llm, response)
-                    
-                    # Add download button
-                    st.download_button(
-                        label="📥 Download Article",
-                        data=f"# Generated Article\n\n**Query:** {user_query}\n**Model:** {selected_llm}\n**Generated on:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n---\n\n{response}",
-                        file_name=f"article_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
-                        mime="text/markdown"
-                    )
-                    
-                except Exception as e:
-                    st.error(f"Error generating article: {str(e)}")
+            try:
+                # Stream tokens as they are produced instead of blocking until
+                # the whole article is generated
+                st.markdown("### Generated Article")
+                st.markdown("---")
+                response = st.write_stream(
+                    stream_llm_response(selected_llm, user_query, max_length)
+                )
+
+                st.success("Article generated successfully!")
+
+                # Save the interaction
+                save_interaction(user_query, selected_llm, response)
+
+                # Add download button
+                st.download_button(
+                    label="📥 Download Article",
+                    data=f"# Generated Article\n\n**Query:** {user_query}\n**Model:** {selected_llm}\n**Generated on:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n---\n\n{response}",
+                    file_name=f"article_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
+                    mime="text/markdown"
+                )
+
+            except Exception as e:
+                st.error(f"Error generating article: {str(e)}")
         else:
             st.warning("⚠️ Please enter a topic or query.")
 
@@ -158,27 +170,37 @@ def display_analytics():
     """Display comprehensive analytics dashboard."""
     st.markdown("<h1 class='main-header'>📊 Analytics Dashboard</h1>", unsafe_allow_html=True)
     
-    # Load data from both sources
-    csv_data = load_csv_data()
-    json_data = get_analytics()
-    
-    if not csv_data and not json_data:
+    # Load data from both sources, skipping re-parse when files are unchanged
+    flush_analytics()  # make buffered entries visible before checking mtimes
+    csv_data = load_csv_data(_file_mtime_ns("interactions.csv"))
+    json_data = _load_jsonl_data(_file_mtime_ns(LOG_FILE))
+
+    # Use CSV data if available, otherwise use JSONL data
+    if csv_data is not None and not csv_data.empty:
+        df = csv_data
+        from_jsonl = False
+    elif json_data is not None and not json_data.empty:
+        df = json_data
+        from_jsonl = True
+    else:
         st.warning("No interaction data found. Generate some articles first!")
         return
-    
-    # Use CSV data if available, otherwise use JSON data
-    data = csv_data if csv_data else json_data
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
-    
-    # Ensure timestamp column exists
+
+    # Ensure timestamp column exists (loaders already parse it as datetime)
     if 'timestamp' not in df.columns:
-        df['timestamp'] = datetime.now().isoformat()
-    
-    # Convert timestamp to datetime
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df['timestamp'] = pd.Timestamp.now()
     df['date'] = df['timestamp'].dt.date
+
+    # Scan the response strings once; the metric and histogram both reuse this
+    if 'response' in df.columns:
+        df['response_length'] = df['response'].str.len()
+
+    # One grouped pass yields both the per-model and per-day aggregates that
+    # the metrics, pie chart and line chart all read from
+    model_col = 'llm_name' if 'llm_name' in df.columns else 'model'
+    usage = df.groupby(['date', model_col]).size().unstack(fill_value=0)
+    model_counts = usage.sum(axis=0).sort_values(ascending=False)
+    daily_counts = usage.sum(axis=1).reset_index(name='count')
     
     # Summary metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -191,12 +213,11 @@ def display_analytics():
         st.metric("Unique Queries", unique_queries)
     
     with col3:
-        model_col = 'llm_name' if 'llm_name' in df.columns else 'model'
-        most_used = df[model_col].mode().iloc[0] if len(df) > 0 else "N/A"
+        most_used = model_counts.index[0] if len(model_counts) > 0 else "N/A"
         st.metric("Most Used Model", most_used)
     
     with col4:
-        avg_length = df['response'].str.len().mean() if 'response' in df.columns else 0
+        avg_length = df['response_length'].mean() if 'response_length' in df.columns else 0
         st.metric("Avg Response Length", f"{avg_length:.0f} chars")
     
     st.markdown("---")
@@ -206,7 +227,6 @@ def display_analytics():
     
     with col1:
         st.subheader("Model Usage Distribution")
-        model_counts = df[model_col].value_counts()
         fig_pie = px.pie(
             values=model_counts.values,
             names=model_counts.index,
@@ -216,9 +236,8 @@ def display_analytics():
     
     with col2:
         st.subheader("Queries Over Time")
-        daily_counts = df.groupby('date').size().reset_index(name='count')
         fig_line = px.line(
-            daily_counts,
+            daily_counts[['date', 'count']],
             x='date',
             y='count',
             title="Number of Queries per Day"
@@ -227,18 +246,34 @@ def display_analytics():
     
     # Response length analysis
     st.subheader("Response Length Analysis")
-    df['response_length'] = df['response'].str.len()
-    fig_hist = px.histogram(
-        df,
-        x='response_length',
-        nbins=20,
-        title="Distribution of Response Lengths"
-    )
+    # Pass only the values Plotly needs instead of the whole frame; pre-bin in
+    # pandas for large logs so the browser payload stays bounded
+    if len(df) > 5000:
+        length_bins = df['response_length'].value_counts(bins=20, sort=False)
+        fig_hist = px.bar(
+            x=length_bins.index.mid,
+            y=length_bins.values,
+            labels={'x': 'response_length', 'y': 'count'},
+            title="Distribution of Response Lengths"
+        )
+    else:
+        fig_hist = px.histogram(
+            x=df['response_length'].to_numpy(),
+            nbins=20,
+            labels={'x': 'response_length'},
+            title="Distribution of Response Lengths"
+        )
     st.plotly_chart(fig_hist, use_container_width=True)
     
     # Raw data table
     st.subheader("Recent Interactions")
-    display_df = df.sort_values('timestamp', ascending=False).head(10)
+    if from_jsonl:
+        # Tail-read the last lines of the log instead of touching the frame
+        display_df = pd.DataFrame(get_recent(10)[::-1])
+        display_df['timestamp'] = pd.to_datetime(display_df['timestamp'])
+    else:
+        # Heap-select the newest 10 rows instead of sorting the whole frame
+        display_df = df.nlargest(10, 'timestamp')
     
     # Format the display
     if 'user_query' in display_df.columns:
@@ -248,7 +283,7 @@ def display_analytics():
     
     # Truncate long responses for display
     display_df_copy = display_df[display_columns].copy()
-    display_df_copy['response'] = display_df_copy['response'].str[:100] + "..."
+    display_df_copy['response'] = display_df_copy['response'].str.slice(0, 100) + "..."
     
     st.dataframe(display_df_copy, use_container_width=True)
     
@@ -274,17 +309,30 @@ def display_analytics():
             mime="application/json"
         )
 
-def load_csv_data():
-    """Load data from interactions.csv."""
+def _file_mtime_ns(file_path):
+    """Modification time used as a cache key, 0 if the file is missing."""
+    return os.stat(file_path).st_mtime_ns if os.path.exists(file_path) else 0
+
+@st.cache_data(show_spinner=False)
+def load_csv_data(mtime_ns=0):
+    """Load interactions.csv as a DataFrame (mtime_ns invalidates the cache)."""
     file_path = "interactions.csv"
     if os.path.exists(file_path):
         try:
-            with open(file_path, mode="r", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                return list(reader)
+            return pd.read_csv(file_path, parse_dates=['timestamp'])
         except Exception as e:
             st.error(f"Error reading CSV file: {str(e)}")
-    return []
+    return None
+
+@st.cache_data(show_spinner=False)
+def _load_jsonl_data(mtime_ns=0):
+    """Load the analytics JSONL log as a DataFrame (mtime_ns invalidates the cache)."""
+    if os.path.exists(LOG_FILE):
+        try:
+            return pd.read_json(LOG_FILE, lines=True)
+        except Exception as e:
+            st.error(f"Error reading analytics file: {str(e)}")
+    return None
 
 def settings_page():
     """Settings and configuration page."""
@@ -322,8 +370,11 @@ def settings_page():
             try:
                 if os.path.exists("interactions.csv"):
                     os.remove("interactions.csv")
-                if os.path.exists("analytics.json"):
-                    os.remove("analytics.json")
+                st.session_state['csv_header_written'] = None
+                if os.path.exists("analytics.jsonl"):
+                    os.remove("analytics.jsonl")
+                for rotated in glob.glob("analytics.jsonl.*"):
+                    os.remove(rotated)
                 st.success("All analytics data cleared!")
             except Exception as e:
                 st.error(f"Error clearing data: {str(e)}")
@@ -348,6 +399,12 @@ def settings_page():
 
 def main():
     """Main application router."""
+    # Warm the smallest model in the background while the user is still typing,
+    # so the first Generate click doesn't pay the multi-second load cost
+    if 'preload_started' not in st.session_state:
+        st.session_state['preload_started'] = True
+        threading.Thread(target=load_model, args=("Bloom-560M",), daemon=True).start()
+
     # Sidebar navigation
     st.sidebar.title("🤖 LLM Article Generator")
     st.sidebar.markdown("---")
@@ -1,12 +1,18 @@
 import os
 import logging
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import threading
+from transformers import AutoModelForCausalLM, AutoTokenizer, TextIteratorStreamer
 import torch
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# CPU inference tuning: use the physical cores (half the logical count) for
+# intra-op parallelism and make sure the oneDNN kernels are enabled
+torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+torch.backends.mkldnn.enabled = True
+
 # Model configurations
 model_names = {
     "GPT-Neo 1.3B": "EleutherAI/gpt-neo-1.3B",
@@ -14,10 +20,17 @@ model_names = {
     "OPT-1.3B": "facebook/opt-1.3b"
 }
 
+# Parameter counts derived once at import instead of per get_model_info call
+_MODEL_PARAMS = {name: ("1.3B" if "1.3B" in name else "560M") for name in model_names}
+
 # Global variables for lazy loading
 loaded_models = {}
 tokenizers = {}
 
+# One lock per model so concurrent callers (e.g. the background preload and a
+# user request) never load the same weights twice
+_model_locks = {name: threading.Lock() for name in model_names}
+
 def load_model(llm_name):
     """Lazy load model and tokenizer when needed."""
     if llm_name in loaded_models:
@@ -28,11 +41,19 @@ def load_model(llm_name):
     
     model_path = model_names[llm_name]
     
+    with _model_locks[llm_name]:
+        # Another thread may have finished loading while we waited on the lock
+        if llm_name in loaded_models:
+            return loaded_models[llm_name], tokenizers[llm_name]
+        return _load_model_locked(llm_name, model_path)
+
+def _load_model_locked(llm_name, model_path):
+    """Do the actual load; callers must hold the model's lock."""
     try:
         logger.info(f"Loading {llm_name}...")
         
-        # Load tokenizer first
-        tokenizer = AutoTokenizer.from_pretrained(model_path)
+        # Load tokenizer first (fast Rust tokenizer is 5-20x quicker than the Python one)
+        tokenizer = AutoTokenizer.from_pretrained(model_path, use_fast=True)
         
         # Set or add a padding token
         if tokenizer.pad_token is None:
@@ -41,18 +62,44 @@ def load_model(llm_name):
             else:
                 tokenizer.add_special_tokens({'pad_token': '[PAD]'})
         
-        # Load model with appropriate settings
-        model = AutoModelForCausalLM.from_pretrained(
-            model_path,
-            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+        # Pick the narrowest dtype the hardware supports - these decoders are
+        # memory-bound, so halving the bytes roughly halves bandwidth
+        if torch.cuda.is_available():
+            torch_dtype = torch.float16
+        elif getattr(torch.cpu, "_is_avx512_bf16_supported", lambda: False)():
+            torch_dtype = torch.bfloat16
+        else:
+            torch_dtype = torch.float32
+
+        # Load model with appropriate settings; not every transformers release
+        # supports SDPA for these architectures, so retry with the default
+        # attention implementation instead of failing the load
+        load_kwargs = dict(
+            torch_dtype=torch_dtype,
             device_map="auto" if torch.cuda.is_available() else None,
             low_cpu_mem_usage=True
         )
-        
+        try:
+            model = AutoModelForCausalLM.from_pretrained(
+                model_path, attn_implementation="sdpa", **load_kwargs
+            )
+        except (ValueError, TypeError):
+            logger.warning(f"SDPA attention unavailable for {llm_name}, using default attention")
+            model = AutoModelForCausalLM.from_pretrained(model_path, **load_kwargs)
+
         # Resize embeddings if we added new tokens
         if tokenizer.pad_token == '[PAD]':
             model.resize_token_embeddings(len(tokenizer))
+
+        # Compile on GPU; the capture cost is repaid after a couple of generations
+        if torch.cuda.is_available():
+            model = torch.compile(model, mode="reduce-overhead", fullgraph=False)
         
+        # Resolve special-token ids once so generate calls don't re-look
+        # them up per request
+        tokenizer._cached_pad_id = tokenizer.pad_token_id
+        tokenizer._cached_eos_id = tokenizer.eos_token_id
+
         # Cache the loaded model and tokenizer
         loaded_models[llm_name] = model
         tokenizers[llm_name] = tokenizer
@@ -69,54 +116,113 @@ def get_llm_response(llm_name, prompt, max_length=200):
     try:
         model, tokenizer = load_model(llm_name)
         
-        # Tokenize the input
+        # Tokenize the input (no padding needed for a single sequence)
         inputs = tokenizer(
-            prompt, 
-            return_tensors="pt", 
-            truncation=True, 
-            max_length=512, 
-            padding=True
+            prompt,
+            return_tensors="pt",
+            truncation=True,
+            max_length=512
         )
         
         # Move to appropriate device
         device = next(model.parameters()).device
         inputs = {k: v.to(device) for k, v in inputs.items()}
         
-        # Generate text with better parameters
-        with torch.no_grad():
+        # Pure sampling with KV-cache: the fastest decoding path for one response
+        # (inference_mode also skips autograd's version-counter bookkeeping)
+        with torch.inference_mode():
             outputs = model.generate(
                 inputs['input_ids'],
                 attention_mask=inputs['attention_mask'],
-                max_length=len(inputs['input_ids'][0]) + max_length,
-                num_beams=2,
-                early_stopping=True,
-                pad_token_id=tokenizer.pad_token_id,
-                eos_token_id=tokenizer.eos_token_id,
+                max_new_tokens=max_length,
+                num_beams=1,
+                pad_token_id=tokenizer._cached_pad_id,
+                eos_token_id=tokenizer._cached_eos_id,
                 do_sample=True,
                 temperature=0.7,
-                repetition_penalty=1.2
+                top_p=0.9,
+                repetition_penalty=1.2,
+                use_cache=True
             )
-        
-        # Decode the generated text
-        response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        
-        # Remove the original prompt from response
-        if response.startswith(prompt):
-            response = response[len(prompt):].strip()
-        
+
+        # Decode only the generated tokens - cost scales with the output
+        # length, not prompt+output, and no prompt string scan is needed
+        input_len = inputs['input_ids'].shape[1]
+        response = tokenizer.decode(outputs[0, input_len:], skip_special_tokens=True).strip()
+
         return response if response else "I apologize, but I couldn't generate a meaningful response."
         
     except Exception as e:
         logger.error(f"Error generating response with {llm_name}: {str(e)}")
         return f"Error: Could not generate response with {llm_name}. Please try again."
 
+def stream_llm_response(llm_name, prompt, max_length=200):
+    """Yield response text chunk by chunk as the model produces them.
+
+    Generation runs in a background thread feeding a TextIteratorStreamer,
+    so the caller sees the first tokens after ~time-to-first-token instead
+    of waiting for the full generation to finish.
+    """
+    try:
+        model, tokenizer = load_model(llm_name)
+
+        # Tokenize the input (no padding needed for a single sequence)
+        inputs = tokenizer(
+            prompt,
+            return_tensors="pt",
+            truncation=True,
+            max_length=512
+        )
+
+        # Move to appropriate device
+        device = next(model.parameters()).device
+        inputs = {k: v.to(device) for k, v in inputs.items()}
+
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        generate_error = []
+
+        def _generate():
+            try:
+                with torch.inference_mode():
+                    model.generate(
+                        inputs['input_ids'],
+                        attention_mask=inputs['attention_mask'],
+                        max_new_tokens=max_length,
+                        num_beams=1,
+                        pad_token_id=tokenizer._cached_pad_id,
+                        eos_token_id=tokenizer._cached_eos_id,
+                        do_sample=True,
+                        temperature=0.7,
+                        top_p=0.9,
+                        repetition_penalty=1.2,
+                        use_cache=True,
+                        streamer=streamer
+                    )
+            except Exception as e:
+                # generate never reaches streamer.end() on failure; signal the
+                # end ourselves so the consuming iterator doesn't block forever
+                generate_error.append(e)
+                streamer.end()
+
+        thread = threading.Thread(target=_generate, daemon=True)
+        thread.start()
+        yield from streamer
+        thread.join()
+
+        if generate_error:
+            raise generate_error[0]
+
+    except Exception as e:
+        logger.error(f"Error generating response with {llm_name}: {str(e)}")
+        yield f"Error: Could not generate response with {llm_name}. Please try again."
+
 def get_model_info():
     """Get information about available models."""
     return {
         name: {
             "path": path,
             "loaded": name in loaded_models,
-            "parameters": "1.3B" if "1.3B" in name else "560M" if "560M" in name else "1.3B"
+            "parameters": _MODEL_PARAMS[name]
         }
         for name, path in model_names.items()
     }